@@ -51,6 +51,185 @@ pub type CapabilityDispatcher = std::sync::Arc<
         + Sync,
 >;
 
+/// Sandbox-only capability that runs a list of `{cap, inputs}` ops in one round-trip.
+const SANDBOX_BATCH_CAP: &str = "ccos.batch";
+
+/// Dispatch a single sandbox op, rejecting nested batches before falling
+/// through to the capability dispatcher.
+async fn dispatch_sandbox_op(
+    dispatcher: &CapabilityDispatcher,
+    cap_id: &str,
+    inputs: serde_json::Value,
+) -> Result<serde_json::Value, RuntimeError> {
+    match cap_id {
+        SANDBOX_BATCH_CAP => Err(RuntimeError::Generic(format!(
+            "{} cannot be nested inside a batch",
+            SANDBOX_BATCH_CAP
+        ))),
+        _ => dispatcher(cap_id.to_string(), inputs).await,
+    }
+}
+
+/// Execute the ops of a `ccos.batch` call in order.
+///
+/// Returns one `{success, value|error}` entry per executed op; execution stops
+/// at the first failing op so later ops never observe a partial state.
+async fn dispatch_sandbox_batch(
+    dispatcher: &CapabilityDispatcher,
+    inputs: serde_json::Value,
+) -> Result<serde_json::Value, RuntimeError> {
+    let ops = inputs["ops"].as_array().ok_or_else(|| {
+        RuntimeError::Generic(format!("{} requires an 'ops' array", SANDBOX_BATCH_CAP))
+    })?;
+    let mut results = Vec::with_capacity(ops.len());
+    for op in ops {
+        let cap_id = op["cap"].as_str().unwrap_or("");
+        match dispatch_sandbox_op(dispatcher, cap_id, op["inputs"].clone()).await {
+            Ok(v) => results.push(serde_json::json!({"success": true, "value": v})),
+            Err(e) => {
+                results.push(serde_json::json!({"success": false, "error": e.to_string()}));
+                break;
+            }
+        }
+    }
+    Ok(serde_json::Value::Array(results))
+}
+
+/// Payloads at least this large travel in length-prefixed `CCOS_CALLN::` /
+/// `CCOS_RESULTN::` frames; smaller ones stay newline-framed for readability.
+/// Must match `_FRAMED_MIN` in ccos_sdk.py.
+const SANDBOX_FRAMED_MIN: usize = 256;
+/// Upper bound on a length-prefixed frame announced by sandboxed code.
+/// Must match `_MAX_FRAME` in ccos_sdk.py.
+const SANDBOX_MAX_FRAME_BYTES: usize = 64 * 1024 * 1024;
+
+/// Wire encoding of a CCOS_CALL payload; the result is sent back the same way.
+#[derive(Debug, Clone, Copy, PartialEq, Eq)]
+enum SandboxEncoding {
+    /// `CCOS_CALL::` / `CCOS_CALLN::` frames carrying UTF-8 JSON.
+    Json,
+    /// `CCOS_CALLM::` frames carrying MessagePack (see [`super::msgpack`]).
+    MsgPack,
+}
+
+/// One unit of sandbox stdout.
+enum SandboxFrame {
+    /// Payload of a `CCOS_CALL::` line or a `CCOS_CALLN::` / `CCOS_CALLM::` frame.
+    Call(SandboxEncoding, Vec<u8>),
+    /// Message of a one-way `CCOS_LOG::` line.
+    Log(String),
+    /// Any other line, passed through as visible stdout.
+    Output(String),
+}
+
+/// Read the next frame from the sandbox's stdout, or `None` at EOF.
+///
+/// `CCOS_CALLN::<len>\n` and `CCOS_CALLM::<len>\n` are followed by exactly
+/// `len` payload bytes, which are read in one go without scanning them for a
+/// newline.
+async fn read_sandbox_frame<R>(reader: &mut R) -> std::io::Result<Option<SandboxFrame>>
+where
+    R: tokio::io::AsyncBufRead + Unpin,
+{
+    use tokio::io::{AsyncBufReadExt, AsyncReadExt};
+
+    let mut line = Vec::new();
+    if reader.read_until(b'\n', &mut line).await? == 0 {
+        return Ok(None);
+    }
+    if line.last() == Some(&b'\n') {
+        line.pop();
+        if line.last() == Some(&b'\r') {
+            line.pop();
+        }
+    }
+
+    // Plain print() output is the common case: one short compare rules out
+    // every frame kind, and the line buffer becomes the String without a copy.
+    if !line.starts_with(b"CCOS_") {
+        return Ok(Some(SandboxFrame::Output(sandbox_text(line))));
+    }
+
+    let framed = if let Some(len) = line.strip_prefix(b"CCOS_CALLN::") {
+        Some((SandboxEncoding::Json, len))
+    } else if let Some(len) = line.strip_prefix(b"CCOS_CALLM::") {
+        Some((SandboxEncoding::MsgPack, len))
+    } else {
+        None
+    };
+    if let Some((encoding, len)) = framed {
+        let len = std::str::from_utf8(len)
+            .ok()
+            .and_then(|s| s.trim().parse::<usize>().ok())
+            .filter(|&n| n <= SANDBOX_MAX_FRAME_BYTES)
+            .ok_or_else(|| {
+                std::io::Error::new(
+                    std::io::ErrorKind::InvalidData,
+                    format!(
+                        "Invalid CCOS_CALL frame length: {}",
+                        String::from_utf8_lossy(len)
+                    ),
+                )
+            })?;
+        let mut payload = vec![0u8; len];
+        reader.read_exact(&mut payload).await?;
+        return Ok(Some(SandboxFrame::Call(encoding, payload)));
+    }
+    if line.starts_with(b"CCOS_CALL::") {
+        line.drain(..b"CCOS_CALL::".len());
+        return Ok(Some(SandboxFrame::Call(SandboxEncoding::Json, line)));
+    }
+    if line.starts_with(b"CCOS_LOG::") {
+        line.drain(..b"CCOS_LOG::".len());
+        return Ok(Some(SandboxFrame::Log(sandbox_text(line))));
+    }
+    Ok(Some(SandboxFrame::Output(sandbox_text(line))))
+}
+
+/// Take ownership of sandbox output as text, replacing invalid UTF-8 only when
+/// there is some.
+fn sandbox_text(bytes: Vec<u8>) -> String {
+    String::from_utf8(bytes).unwrap_or_else(|e| String::from_utf8_lossy(e.as_bytes()).into_owned())
+}
+
+/// Decode a CCOS_CALL payload into its `{cap, inputs}` envelope.
+fn decode_sandbox_call(
+    encoding: SandboxEncoding,
+    payload: &[u8],
+) -> Result<serde_json::Value, String> {
+    match encoding {
+        SandboxEncoding::Json => serde_json::from_slice(payload).map_err(|e| e.to_string()),
+        SandboxEncoding::MsgPack => super::msgpack::decode(payload),
+    }
+}
+
+/// Encode a result envelope in the caller's encoding.
+///
+/// JSON goes out as a `CCOS_RESULT::` line, or as a `CCOS_RESULTN::<len>\n`
+/// frame once it reaches `SANDBOX_FRAMED_MIN`; MessagePack always uses a
+/// `CCOS_RESULTM::<len>\n` frame.
+fn encode_sandbox_result(encoding: SandboxEncoding, result: &serde_json::Value) -> Vec<u8> {
+    let payload = match encoding {
+        SandboxEncoding::Json => serde_json::to_vec(result)
+            .unwrap_or_else(|_| br#"{"success":false,"error":"serialise"}"#.to_vec()),
+        SandboxEncoding::MsgPack => super::msgpack::encode(result),
+    };
+    let mut frame = Vec::with_capacity(payload.len() + 24);
+    if encoding == SandboxEncoding::Json && payload.len() < SANDBOX_FRAMED_MIN {
+        frame.extend_from_slice(b"CCOS_RESULT::");
+        frame.extend_from_slice(&payload);
+        frame.push(b'\n');
+    } else {
+        let prefix = match encoding {
+            SandboxEncoding::Json => "CCOS_RESULTN::",
+            SandboxEncoding::MsgPack => "CCOS_RESULTM::",
+        };
+        frame.extend_from_slice(format!("{}{}\n", prefix, payload.len()).as_bytes());
+        frame.extend_from_slice(&payload);
+    }
+    frame
+}
+
 /// Content of ccos_sdk.py embedded at compile time for mounting into the sandbox.
 const CCOS_SDK_PY: &str = include_str!("ccos_sdk.py");
 
@@ -284,7 +463,10 @@ impl BubblewrapSandbox {
         .await
     }
 
-    /// Execute Python code with a two-way CCOS_CALL:: / CCOS_RESULT:: IPC protocol.
+    /// Execute Python code with a two-way CCOS_CALL:: / CCOS_RESULT:: IPC protocol
+    /// (or their length-prefixed CCOS_CALLN:: / CCOS_RESULTN:: variants for large
+    /// payloads, and CCOS_CALLM:: / CCOS_RESULTM:: for MessagePack). One-way
+    /// CCOS_LOG:: lines are forwarded to `ccos.io.log` without a reply.
     /// Supports optional dependency installation via `uv`.
     pub async fn execute_python_interactive(
         &self,
@@ -295,7 +477,7 @@ impl BubblewrapSandbox {
         dep_manager: Option<&super::DependencyManager>,
         dispatcher: CapabilityDispatcher,
     ) -> Result<SandboxExecutionResult, RuntimeError> {
-        use tokio::io::{AsyncBufReadExt, AsyncReadExt, AsyncWriteExt, BufReader};
+        use tokio::io::{AsyncReadExt, AsyncWriteExt, BufReader};
         use tracing::{info, warn};
 
         self.scanner
@@ -561,7 +743,7 @@ impl BubblewrapSandbox {
         });
 
         let mut stdin_writer = tokio::io::BufWriter::new(stdin);
-        let mut stdout_reader = BufReader::new(stdout).lines();
+        let mut stdout_reader = BufReader::new(stdout);
         let mut visible_stdout = String::new();
         let deadline = tokio::time::Instant::now() + Duration::from_millis(timeout_ms);
 
@@ -576,7 +758,7 @@ impl BubblewrapSandbox {
                 )));
             }
 
-            match tokio::time::timeout(remaining, stdout_reader.next_line()).await {
+            match tokio::time::timeout(remaining, read_sandbox_frame(&mut stdout_reader)).await {
                 Err(_) => {
                     let _ = child.kill().await;
                     return Err(RuntimeError::Generic(format!(
@@ -585,49 +767,59 @@ impl BubblewrapSandbox {
                     )));
                 }
                 Ok(Err(e)) => {
-                    return Err(RuntimeError::Generic(format!("Stdout read error: {}", e)))
+                    let _ = child.kill().await;
+                    return Err(RuntimeError::Generic(format!("Stdout read error: {}", e)));
                 }
                 Ok(Ok(None)) => break, // EOF — process finished writing
-                Ok(Ok(Some(line))) => {
-                    if let Some(json_str) = line.strip_prefix("CCOS_CALL::") {
-                        // Dispatch capability call
-                        let result_json = match serde_json::from_str::<serde_json::Value>(json_str)
-                        {
-                            Err(e) => {
-                                log::warn!("[sandbox] Invalid CCOS_CALL JSON: {}", e);
-                                serde_json::json!({"success": false, "error": format!("Invalid call JSON: {}", e)})
-                            }
-                            Ok(call) => {
-                                let cap_id = call["cap"].as_str().unwrap_or("").to_string();
-                                let inputs = call["inputs"].clone();
-                                match dispatcher(cap_id.clone(), inputs).await {
-                                    Ok(v) => {
-                                        log::debug!("[sandbox] CCOS_CALL {} → ok", cap_id);
-                                        serde_json::json!({"success": true, "value": v})
-                                    }
-                                    Err(e) => {
-                                        log::warn!("[sandbox] CCOS_CALL {} → error: {}", cap_id, e);
-                                        serde_json::json!({"success": false, "error": e.to_string()})
-                                    }
+                Ok(Ok(Some(SandboxFrame::Call(encoding, payload)))) => {
+                    // Dispatch capability call
+                    let result_json = match decode_sandbox_call(encoding, &payload) {
+                        Err(e) => {
+                            log::warn!("[sandbox] Invalid CCOS_CALL payload: {}", e);
+                            serde_json::json!({"success": false, "error": format!("Invalid call payload: {}", e)})
+                        }
+                        Ok(call) => {
+                            let cap_id = call["cap"].as_str().unwrap_or("").to_string();
+                            let inputs = call["inputs"].clone();
+                            let outcome = if cap_id == SANDBOX_BATCH_CAP {
+                                dispatch_sandbox_batch(&dispatcher, inputs).await
+                            } else {
+                                dispatch_sandbox_op(&dispatcher, &cap_id, inputs).await
+                            };
+                            match outcome {
+                                Ok(v) => {
+                                    log::debug!("[sandbox] CCOS_CALL {} → ok", cap_id);
+                                    serde_json::json!({"success": true, "value": v})
+                                }
+                                Err(e) => {
+                                    log::warn!("[sandbox] CCOS_CALL {} → error: {}", cap_id, e);
+                                    serde_json::json!({"success": false, "error": e.to_string()})
                                 }
                             }
-                        };
-                        // Write result to Python's stdin
-                        let response = format!(
-                            "CCOS_RESULT::{}\n",
-                            serde_json::to_string(&result_json).unwrap_or_else(|_| {
-                                r#"{"success":false,"error":"serialise"}"#.to_string()
-                            })
-                        );
-                        if let Err(e) = stdin_writer.write_all(response.as_bytes()).await {
-                            log::warn!("[sandbox] Failed to write CCOS_RESULT to stdin: {}", e);
                         }
-                        let _ = stdin_writer.flush().await;
-                    } else {
-                        visible_stdout.push_str(&line);
-                        visible_stdout.push('\n');
+                    };
+                    // Write result to Python's stdin
+                    let response = encode_sandbox_result(encoding, &result_json);
+                    if let Err(e) = stdin_writer.write_all(&response).await {
+                        log::warn!("[sandbox] Failed to write CCOS_RESULT to stdin: {}", e);
+                    }
+                    let _ = stdin_writer.flush().await;
+                }
+                Ok(Ok(Some(SandboxFrame::Log(message)))) => {
+                    // Fire-and-forget log frame: no CCOS_RESULT is written back.
+                    if let Err(e) = dispatcher(
+                        "ccos.io.log".to_string(),
+                        serde_json::json!({ "message": message }),
+                    )
+                    .await
+                    {
+                        log::debug!("[sandbox] CCOS_LOG dispatch failed: {}", e);
                     }
                 }
+                Ok(Ok(Some(SandboxFrame::Output(line)))) => {
+                    visible_stdout.push_str(&line);
+                    visible_stdout.push('\n');
+                }
             }
         }
 
@@ -1490,3 +1682,174 @@ impl SecurityScanner {
         Ok(())
     }
 }
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+    use serde_json::json;
+    use std::sync::Arc;
+
+    async fn frames(input: &[u8]) -> Vec<std::io::Result<Option<SandboxFrame>>> {
+        let mut reader = tokio::io::BufReader::new(input);
+        let mut out = Vec::new();
+        loop {
+            let frame = read_sandbox_frame(&mut reader).await;
+            let stop = !matches!(frame, Ok(Some(_)));
+            out.push(frame);
+            if stop {
+                return out;
+            }
+        }
+    }
+
+    fn output(frame: &std::io::Result<Option<SandboxFrame>>) -> &str {
+        match frame {
+            Ok(Some(SandboxFrame::Output(s))) => s,
+            _ => panic!("expected an output line"),
+        }
+    }
+
+    fn call(frame: &std::io::Result<Option<SandboxFrame>>) -> (SandboxEncoding, &[u8]) {
+        match frame {
+            Ok(Some(SandboxFrame::Call(encoding, payload))) => (*encoding, payload),
+            _ => panic!("expected a call frame"),
+        }
+    }
+
+    #[tokio::test]
+    async fn test_read_mixed_frames() {
+        let mut input = Vec::new();
+        input.extend_from_slice(b"hello\r\n");
+        input.extend_from_slice(b"CCOS_LOG::working\n");
+        input.extend_from_slice(b"CCOS_CALL::{\"cap\":\"ccos.io.log\"}\n");
+        // The payload of a length-prefixed frame may itself contain newlines.
+        input.extend_from_slice(b"CCOS_CALLN::8\n{\"a\":\n1}");
+        input.extend_from_slice(b"CCOS_NOT_A_FRAME\n");
+        input.extend_from_slice(b"\xffbad utf8\n");
+        input.extend_from_slice(b"no trailing newline");
+
+        let frames = frames(&input).await;
+        assert_eq!(frames.len(), 8);
+        assert_eq!(output(&frames[0]), "hello");
+        match &frames[1] {
+            Ok(Some(SandboxFrame::Log(msg))) => assert_eq!(msg, "working"),
+            _ => panic!("expected a log frame"),
+        }
+        assert_eq!(
+            call(&frames[2]),
+            (SandboxEncoding::Json, &b"{\"cap\":\"ccos.io.log\"}"[..])
+        );
+        assert_eq!(
+            call(&frames[3]),
+            (SandboxEncoding::Json, &b"{\"a\":\n1}"[..])
+        );
+        assert_eq!(output(&frames[4]), "CCOS_NOT_A_FRAME");
+        assert_eq!(output(&frames[5]), "\u{FFFD}bad utf8");
+        assert_eq!(output(&frames[6]), "no trailing newline");
+        assert!(matches!(frames[7], Ok(None)));
+    }
+
+    #[tokio::test]
+    async fn test_read_msgpack_frame() {
+        let value = json!({"cap": "ccos.memory.get", "inputs": {"key": "k"}});
+        let payload = super::super::msgpack::encode(&value);
+        let mut input = format!("CCOS_CALLM::{}\n", payload.len()).into_bytes();
+        input.extend_from_slice(&payload);
+
+        let frames = frames(&input).await;
+        let (encoding, bytes) = call(&frames[0]);
+        assert_eq!(encoding, SandboxEncoding::MsgPack);
+        assert_eq!(decode_sandbox_call(encoding, bytes).unwrap(), value);
+        assert!(matches!(frames[1], Ok(None)));
+    }
+
+    #[tokio::test]
+    async fn test_read_malformed_frame_length() {
+        let too_big = format!("CCOS_CALLN::{}\n", SANDBOX_MAX_FRAME_BYTES + 1);
+        for input in [
+            &b"CCOS_CALLN::abc\n"[..],
+            &b"CCOS_CALLM::-1\n"[..],
+            &b"CCOS_CALLN::\n"[..],
+            too_big.as_bytes(),
+        ] {
+            let frames = frames(input).await;
+            let err = frames[0].as_ref().err().expect("expected an error");
+            assert_eq!(err.kind(), std::io::ErrorKind::InvalidData);
+        }
+
+        // Announced length longer than what the sandbox actually wrote.
+        let frames = frames(b"CCOS_CALLN::10\nshort").await;
+        let err = frames[0].as_ref().err().expect("expected an error");
+        assert_eq!(err.kind(), std::io::ErrorKind::UnexpectedEof);
+    }
+
+    #[test]
+    fn test_encode_result_framing_threshold() {
+        // `{"success":true,"value":""}` is 27 bytes of JSON.
+        let result = |n: usize| json!({"success": true, "value": "x".repeat(n)});
+
+        let line = encode_sandbox_result(SandboxEncoding::Json, &result(SANDBOX_FRAMED_MIN - 28));
+        let body = line
+            .strip_prefix(b"CCOS_RESULT::")
+            .and_then(|rest| rest.strip_suffix(b"\n"))
+            .expect("expected a CCOS_RESULT:: line");
+        assert_eq!(body.len(), SANDBOX_FRAMED_MIN - 1);
+        assert_eq!(
+            serde_json::from_slice::<serde_json::Value>(body).unwrap(),
+            result(SANDBOX_FRAMED_MIN - 28)
+        );
+
+        let frame = encode_sandbox_result(SandboxEncoding::Json, &result(SANDBOX_FRAMED_MIN - 27));
+        let header = format!("CCOS_RESULTN::{}\n", SANDBOX_FRAMED_MIN);
+        let body = frame
+            .strip_prefix(header.as_bytes())
+            .expect("expected a CCOS_RESULTN:: frame");
+        assert_eq!(body.len(), SANDBOX_FRAMED_MIN);
+        assert_eq!(
+            serde_json::from_slice::<serde_json::Value>(body).unwrap(),
+            result(SANDBOX_FRAMED_MIN - 27)
+        );
+
+        // The SDK must switch to length-prefixed frames at the same size.
+        assert!(CCOS_SDK_PY.contains(&format!("\n_FRAMED_MIN = {}\n", SANDBOX_FRAMED_MIN)));
+        assert_eq!(SANDBOX_MAX_FRAME_BYTES, 64 * 1024 * 1024);
+        assert!(CCOS_SDK_PY.contains("\n_MAX_FRAME = 64 * 1024 * 1024\n"));
+
+        let small = json!({"success": true, "value": 1});
+        let frame = encode_sandbox_result(SandboxEncoding::MsgPack, &small);
+        let payload = super::super::msgpack::encode(&small);
+        let header = format!("CCOS_RESULTM::{}\n", payload.len());
+        assert_eq!(frame.strip_prefix(header.as_bytes()), Some(&payload[..]));
+    }
+
+    #[tokio::test]
+    async fn test_batch_stops_at_first_failure() {
+        let dispatcher: CapabilityDispatcher = Arc::new(|cap: String, inputs| {
+            Box::pin(async move {
+                if cap == "test.fail" {
+                    Err(RuntimeError::Generic("boom".to_string()))
+                } else {
+                    Ok(inputs)
+                }
+            })
+        });
+        let inputs = json!({"ops": [
+            {"cap": "test.echo", "inputs": 1},
+            {"cap": "test.fail", "inputs": 2},
+            {"cap": "test.echo", "inputs": 3},
+        ]});
+        let results = dispatch_sandbox_batch(&dispatcher, inputs).await.unwrap();
+        let results = results.as_array().unwrap();
+        assert_eq!(results.len(), 2);
+        assert_eq!(results[0], json!({"success": true, "value": 1}));
+        assert_eq!(results[1]["success"], json!(false));
+
+        let nested = json!({"ops": [{"cap": SANDBOX_BATCH_CAP, "inputs": {"ops": []}}]});
+        let results = dispatch_sandbox_batch(&dispatcher, nested).await.unwrap();
+        assert_eq!(results[0]["success"], json!(false));
+
+        assert!(dispatch_sandbox_batch(&dispatcher, json!({}))
+            .await
+            .is_err());
+    }
+}
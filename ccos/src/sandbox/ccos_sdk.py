@@ -13,8 +13,31 @@ markers on stdout that the CCOS sandbox runner intercepts and dispatches:
 
     CCOS_CALL::<json>        ← Python writes to stdout
     CCOS_RESULT::<json>      ← host writes to Python's stdin
+    CCOS_LOG::<message>      ← Python writes to stdout, no reply
 
-Where each <json> is a UTF-8 JSON object.
+Where each <json> is a UTF-8 JSON object. CCOS_LOG:: carries a raw single-line
+UTF-8 message that the host forwards to `ccos.io.log`; Python does not wait
+for a result.
+
+Payloads of 256 bytes or more use length-prefixed frames instead, so the
+reader copies them in one go rather than scanning them for a newline:
+
+    CCOS_CALLN::<len>        ← header line, then exactly <len> bytes of JSON
+    CCOS_RESULTN::<len>      ← same framing, host → Python
+
+A single frame may carry at most 64 MiB; larger calls raise RuntimeError
+before anything is written.
+
+When the `msgpack` package is importable, calls are sent as MessagePack in
+the same length-prefixed framing and the host answers in kind:
+
+    CCOS_CALLM::<len>        ← header line, then exactly <len> bytes of msgpack
+    CCOS_RESULTM::<len>      ← same framing, host → Python
+
+Values msgpack cannot represent (e.g. ints wider than 64 bits) fall back to
+the JSON frames. Both encodings accept the same inputs: `bytes` values fail
+either way (TypeError from the JSON encoder, or a RuntimeError from the host,
+which rejects MessagePack bin).
 
 CCOS_CALL shape:
     { "cap": "<capability_id>", "inputs": { ... } }
@@ -23,9 +46,13 @@ CCOS_RESULT shape:
     { "success": true,  "value": <result_json> }   # on success
     { "success": false, "error": "<message>"    }   # on failure
 
-The host intercepts each CCOS_CALL:: line, executes the local capability
-synchronously, then writes one CCOS_RESULT:: line to stdin. Python blocks on
-`sys.stdin.readline()` until the result arrives, making the call appear
+`ccos.batch` is handled by the host loop itself rather than the capability
+registry: inputs `{ "ops": [<CCOS_CALL shape>, ...] }`, value is one
+`{ "success", "value" | "error" }` entry per executed op.
+
+The host intercepts each CCOS_CALL:: frame, executes the local capability
+synchronously, then writes one CCOS_RESULT:: frame to stdin. Python blocks on
+`os.read()` of stdin until the result arrives, making the call appear
 synchronous from Python's perspective.
 
 The host runner mounts this file at /workspace/input/ccos_sdk.py and sets
@@ -45,37 +72,210 @@ USAGE EXAMPLE
 
 from __future__ import annotations
 
+import copy
 import json
+import os
 import sys
+from types import SimpleNamespace
 from typing import Any
 
+try:  # orjson is a much faster C encoder/decoder; fall back to stdlib json
+    import orjson
+except ImportError:  # pragma: no cover - depends on sandbox image
+    orjson = None
+
+try:  # msgpack frames are more compact than JSON; used whenever available
+    import msgpack
+except ImportError:  # pragma: no cover - depends on sandbox image
+    msgpack = None
+
+
+_CALL_PREFIX_B = b"CCOS_CALL::"
+_CALLN_PREFIX_B = b"CCOS_CALLN::"
+_CALLM_PREFIX_B = b"CCOS_CALLM::"
+_LOG_PREFIX_B = b"CCOS_LOG::"
+_RESULT_PREFIX_B = b"CCOS_RESULT::"
+_RESULTN_PREFIX_B = b"CCOS_RESULTN::"
+_RESULTM_PREFIX_B = b"CCOS_RESULTM::"
+
+# Payloads at least this large are sent length-prefixed rather than
+# newline-terminated. Must match SANDBOX_FRAMED_MIN in bubblewrap.rs.
+_FRAMED_MIN = 256
+# Largest length-prefixed payload the host accepts; a bigger frame aborts the
+# whole execution. Must match SANDBOX_MAX_FRAME_BYTES in bubblewrap.rs.
+_MAX_FRAME = 64 * 1024 * 1024
+
+# Raw stdout: frames are written with os.write() on the fd, bypassing the
+# TextIOWrapper and BufferedWriter layers (no str encode, no extra copy).
+# Safe to interleave with print() because the host sets PYTHONUNBUFFERED=1,
+# so the Python-level stdout buffers never hold pending data.
+_STDOUT_FD = sys.stdout.fileno()
+# Raw stdin: results are read with os.read() into a reusable buffer and
+# parsed straight from bytes, bypassing BufferedReader/TextIOWrapper.
+_STDIN_FD = sys.stdin.fileno()
+_RXBUF = bytearray()
+
+# Opt-in local memo of Working Memory reads (CCOS_SDK_MEMORY_CACHE=1), so
+# repeated get(k) in one script is a dict lookup rather than a host round-trip.
+# Kept coherent with this process's own writes only; misses and expired
+# entries are never cached.
+_CACHE_ENABLED = os.environ.get("CCOS_SDK_MEMORY_CACHE", "0") == "1"
+_cache: dict[str, Any] = {}
+_MISSING = object()
+_IMMUTABLE = (str, int, float, bool, type(None))
+
+_BUILTIN_CAPS = ("ccos.memory.get", "ccos.memory.store", "ccos.io.log")
+
+# Pre-encoded frame pieces for the built-in caps, so hot calls only serialise
+# their inputs and concatenate constants. Per cap: the whole CCOS_CALL:: line
+# head up to the inputs, and the bare JSON envelope head for CCOS_CALLN::.
+def _json_head(cap: str) -> bytes:
+    return b'{"cap":"' + cap.encode("ascii") + b'","inputs":'
+
+
+_FRAME_TPL = {cap: (_CALL_PREFIX_B + _json_head(cap), _json_head(cap)) for cap in _BUILTIN_CAPS}
+
+# Same idea for MessagePack: a fixmap of two entries, "cap" then "inputs".
+_MSGPACK_TPL = (
+    {cap: b"\x82\xa3cap" + msgpack.packb(cap) + b"\xa6inputs" for cap in _BUILTIN_CAPS}
+    if msgpack is not None
+    else {}
+)
+
+
+def _dumps(obj: Any) -> bytes:  # noqa: ANN401
+    """Serialise `obj` to UTF-8 JSON bytes, preferring orjson when available."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj)
+        except TypeError:
+            # orjson rejects ints wider than 64 bits and non-str dict keys;
+            # stdlib json accepts both.
+            pass
+    return json.dumps(obj, ensure_ascii=False).encode("utf-8")
 
-_CALL_PREFIX = "CCOS_CALL::"
-_RESULT_PREFIX = "CCOS_RESULT::"
 
+def _loads(data: bytes) -> Any:  # noqa: ANN401
+    """Parse a JSON document, preferring orjson when available."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
 
-def _call(cap: str, inputs: dict) -> Any:  # noqa: ANN401
-    """Emit a CCOS_CALL:: marker on stdout, block until CCOS_RESULT:: arrives on stdin.
 
-    Returns the deserialized result value, or raises RuntimeError on failure.
-    """
-    marker = json.dumps({"cap": cap, "inputs": inputs}, ensure_ascii=False)
-    # Write to stderr-less stdout (PYTHONUNBUFFERED=1 is set by the host).
-    sys.stdout.write(f"{_CALL_PREFIX}{marker}\n")
-    sys.stdout.flush()
+def _write(frame: bytes) -> None:
+    """Write a whole frame to stdout; one write(2) unless the pipe takes less."""
+    view = memoryview(frame)
+    while view:
+        view = view[os.write(_STDOUT_FD, view):]
 
-    # Block waiting for the host to write the result back.
-    result_line = sys.stdin.readline()
-    if not result_line:
+
+def _readline() -> bytes:
+    """Return the next line from stdin without its newline (b"" at EOF).
+
+    Bytes past the newline are kept in `_RXBUF` for the next call.
+    """
+    start = 0
+    while True:
+        end = _RXBUF.find(b"\n", start)
+        if end >= 0:
+            line = bytes(_RXBUF[:end])
+            del _RXBUF[:end + 1]
+            return line
+        chunk = os.read(_STDIN_FD, 65536)
+        if not chunk:
+            line = bytes(_RXBUF)
+            _RXBUF.clear()
+            return line
+        start = len(_RXBUF)
+        _RXBUF.extend(chunk)
+
+
+def _read_exact(size: int) -> bytes:
+    """Return the next `size` bytes from stdin (fewer only at EOF)."""
+    while len(_RXBUF) < size:
+        chunk = os.read(_STDIN_FD, max(65536, size - len(_RXBUF)))
+        if not chunk:
+            break
+        _RXBUF.extend(chunk)
+    data = bytes(_RXBUF[:size])
+    del _RXBUF[:size]
+    return data
+
+
+def _read_frame(size_field: bytes, cap: str) -> bytes:
+    """Read the payload of a length-prefixed result frame."""
+    size = int(size_field)
+    payload = _read_exact(size)
+    if len(payload) < size:
+        raise RuntimeError(f"CCOS host closed stdin mid-result for cap '{cap}'")
+    return payload
+
+
+def _read_result(cap: str) -> dict:
+    """Block until the host answers `cap`; return the decoded result envelope."""
+    header = _readline()
+    if not header:
         raise RuntimeError(f"CCOS host closed stdin before returning result for cap '{cap}'")
 
-    result_line = result_line.rstrip("\n")
-    if not result_line.startswith(_RESULT_PREFIX):
+    if header.startswith(_RESULT_PREFIX_B):
+        return _loads(header[len(_RESULT_PREFIX_B):])
+    if header.startswith(_RESULTN_PREFIX_B):
+        return _loads(_read_frame(header[len(_RESULTN_PREFIX_B):], cap))
+    if header.startswith(_RESULTM_PREFIX_B):
+        return msgpack.unpackb(_read_frame(header[len(_RESULTM_PREFIX_B):], cap), raw=False)
+    raise RuntimeError(
+        f"Unexpected response from CCOS host (cap '{cap}'): "
+        f"{header.decode('utf-8', 'replace')!r}"
+    )
+
+
+def _framed(prefix: bytes, cap: str, payload: bytes) -> bytes:
+    """Length-prefix `payload`, refusing frames the host would reject."""
+    if len(payload) > _MAX_FRAME:
         raise RuntimeError(
-            f"Unexpected response from CCOS host (cap '{cap}'): {result_line!r}"
+            f"Capability '{cap}' call is {len(payload)} bytes; the sandbox limit is {_MAX_FRAME}"
         )
+    return b"%s%d\n%s" % (prefix, len(payload), payload)
+
+
+def _encode_call(cap: str, inputs: dict) -> bytes:
+    """Build the complete CCOS_CALL frame for `cap`, as MessagePack when possible."""
+    if msgpack is not None:
+        try:
+            head = _MSGPACK_TPL.get(cap)
+            if head is not None:
+                payload = head + msgpack.packb(inputs, use_bin_type=True)
+            else:
+                payload = msgpack.packb({"cap": cap, "inputs": inputs}, use_bin_type=True)
+        except (TypeError, ValueError, OverflowError):
+            # Ints wider than 64 bits or unsupported types: use the JSON path.
+            pass
+        else:
+            return _framed(_CALLM_PREFIX_B, cap, payload)
+
+    tpl = _FRAME_TPL.get(cap)
+    if tpl is not None:
+        line_head, head = tpl
+        body = _dumps(inputs)
+        if len(head) + len(body) + 1 < _FRAMED_MIN:
+            return line_head + body + b"}\n"
+        payload = head + body + b"}"
+    else:
+        payload = _dumps({"cap": cap, "inputs": inputs})
+        if len(payload) < _FRAMED_MIN:
+            return _CALL_PREFIX_B + payload + b"\n"
+    return _framed(_CALLN_PREFIX_B, cap, payload)
+
+
+def _call(cap: str, inputs: dict) -> Any:  # noqa: ANN401
+    """Emit a CCOS_CALL:: marker on stdout, block until CCOS_RESULT:: arrives on stdin.
+
+    Returns the deserialized result value, or raises RuntimeError on failure.
+    """
+    _write(_encode_call(cap, inputs))
 
-    result = json.loads(result_line[len(_RESULT_PREFIX):])
+    # Block waiting for the host to write the result back.
+    result = _read_result(cap)
     if result.get("success"):
         return result.get("value")
     raise RuntimeError(f"Capability '{cap}' failed: {result.get('error', 'unknown error')}")
@@ -85,73 +285,157 @@ def _call(cap: str, inputs: dict) -> Any:  # noqa: ANN401
 # Memory namespace
 # ---------------------------------------------------------------------------
 
-class _Memory:
-    """Interface to ccos.memory.get / ccos.memory.store."""
+def _snapshot(value: Any) -> Any:  # noqa: ANN401
+    """Copy mutable values so callers never share an object with the cache."""
+    if isinstance(value, _IMMUTABLE):
+        return value
+    return copy.deepcopy(value)
 
-    def get(self, key: str, default: Any = None) -> Any:  # noqa: ANN401
-        """Retrieve a value from Working Memory.
 
-        Returns the stored value, or `default` if the key does not exist.
-        Blocks until the host dispatches the capability and returns the result.
-        """
-        result = _call("ccos.memory.get", {"key": key, "default": default})
-        # result is the serialised MemoryGetOutput:
-        # { "value": <any>, "found": bool, "expired": bool }
-        if isinstance(result, dict):
-            if result.get("found"):
-                return result.get("value", default)
-            return default
-        return default
+def _remember(key: str, value: Any) -> None:  # noqa: ANN401
+    if _CACHE_ENABLED:
+        _cache[key] = _snapshot(value)
 
-    def store(self, key: str, value: Any) -> None:  # noqa: ANN401
-        """Store a value in Working Memory under the given key.
 
-        Blocks until the host confirms the write.
-        """
-        _call("ccos.memory.store", {"key": key, "value": value})
+def get(key: str, default: Any = None) -> Any:  # noqa: ANN401
+    """Retrieve a value from Working Memory.
 
+    Returns the stored value, or `default` if the key does not exist or has
+    expired. Blocks until the host dispatches the capability and returns the
+    result.
 
-# ---------------------------------------------------------------------------
-# IO / logging namespace
-# ---------------------------------------------------------------------------
+    With CCOS_SDK_MEMORY_CACHE=1, a value once found is served locally for the
+    rest of the script: writes made by the host or other agents, and the
+    entry's TTL, are not seen until `invalidate(key)`. Misses and expired
+    entries always go back to the host.
+    """
+    if _CACHE_ENABLED:
+        cached = _cache.get(key, _MISSING)
+        if cached is not _MISSING:
+            return _snapshot(cached)
+    # `default` stays local: the host's input field is optional, so there is
+    # no need to serialise it just to have it echoed back on a miss.
+    result = _call("ccos.memory.get", {"key": key})
+    # result is the serialised MemoryGetOutput:
+    # { "value": <any>, "found": bool, "expired": bool }
+    if isinstance(result, dict) and result.get("found") and not result.get("expired"):
+        value = result.get("value")
+        _remember(key, value)
+        return value
+    return default
+
+
+def store(key: str, value: Any) -> None:  # noqa: ANN401
+    """Store a value in Working Memory under the given key.
+
+    Blocks until the host confirms the write.
+    """
+    _cache.pop(key, None)
+    _call("ccos.memory.store", {"key": key, "value": value})
+    _remember(key, value)
 
-class _IO:
-    """Utility I/O helpers."""
 
-    def log(self, message: str) -> None:
-        """Emit a log message via ccos.io.log (best-effort, non-blocking result)."""
-        try:
-            _call("ccos.io.log", {"message": str(message)})
-        except Exception:  # noqa: BLE001
-            # Logging must never crash user code.
-            pass
+def compare_and_swap(key: str, old: Any, new: Any) -> bool:  # noqa: ANN401
+    """Store `new` under `key` only if its current value equals `old`.
 
+    A missing or expired key compares equal to `None`. The host reads,
+    compares and writes under one Working Memory lock, so no other writer can
+    interleave. Returns True if `new` was stored.
+    """
+    _cache.pop(key, None)
+    result = _call("ccos.memory.compare_and_swap", {"key": key, "old": old, "new": new})
+    swapped = isinstance(result, dict) and bool(result.get("swapped"))
+    if swapped:
+        _remember(key, new)
+    return swapped
+
+
+def invalidate(key: str) -> None:
+    """Drop `key` from the local read cache so the next get() asks the host.
+
+    Use this when the value may have been changed outside this script.
+    """
+    _cache.pop(key, None)
+
+
+def invalidate_all() -> None:
+    """Empty the local read cache."""
+    _cache.clear()
 
-# ---------------------------------------------------------------------------
-# Top-level CCOS object
-# ---------------------------------------------------------------------------
 
-class _CCOS:
-    memory: _Memory = _Memory()
-    io: _IO = _IO()
+def _forget(cap: str, inputs: Any) -> None:  # noqa: ANN401
+    """Drop the cached key a generic or batched memory call may touch."""
+    if cap.startswith("ccos.memory.") and isinstance(inputs, dict):
+        key = inputs.get("key")
+        if isinstance(key, str):
+            _cache.pop(key, None)
 
-    def call(self, capability_id: str, inputs: dict) -> Any:  # noqa: ANN401
-        """Generic capability call — dispatches any local CCOS capability."""
-        return _call(capability_id, inputs)
 
+# ---------------------------------------------------------------------------
+# IO / logging namespace
+# ---------------------------------------------------------------------------
+
+def log(message: str) -> None:
+    """Emit a log message via ccos.io.log (best-effort, non-blocking result).
 
-# Singleton exported as `ccos`
-ccos = _CCOS()
+    Single-line messages go out as a raw CCOS_LOG:: frame with no JSON and no
+    reply to wait for; multi-line ones fall back to a regular CCOS_CALL.
+    """
+    try:
+        text = str(message)
+        if "\n" in text:
+            _call("ccos.io.log", {"message": text})
+            return
+        _write(_LOG_PREFIX_B + text.encode("utf-8", "replace") + b"\n")
+    except Exception:  # noqa: BLE001
+        # Logging must never crash user code.
+        pass
 
-# Module-level aliases so `import ccos_sdk; ccos_sdk.memory.get(...)` works
-# (the prompts and docs use this flat style rather than `ccos_sdk.ccos.memory`)
-memory: _Memory = ccos.memory
-io: _IO = ccos.io
 
+# ---------------------------------------------------------------------------
+# Top-level CCOS object
+# ---------------------------------------------------------------------------
 
 def call(capability_id: str, inputs: dict) -> Any:  # noqa: ANN401
-    """Module-level generic capability call — delegates to ccos.call()."""
-    return ccos.call(capability_id, inputs)
+    """Generic capability call — dispatches any local CCOS capability."""
+    _forget(capability_id, inputs)
+    return _call(capability_id, inputs)
+
 
+def batch(ops: list) -> list:
+    """Run several capability calls in one CCOS_CALL round-trip.
 
-__all__ = ["ccos", "memory", "io", "call"]
+    `ops` is a list of `{"cap": "<capability_id>", "inputs": {...}}` dicts,
+    executed in order by the host. Returns the list of per-op values. Raises
+    RuntimeError on the first failed op; the ops after it are not executed.
+    """
+    for op in ops:
+        _forget(op.get("cap", ""), op.get("inputs"))
+    results = _call("ccos.batch", {"ops": ops})
+    values = []
+    for i, result in enumerate(results):
+        if not result.get("success"):
+            raise RuntimeError(
+                f"Batch op {i} ('{ops[i].get('cap')}') failed: "
+                f"{result.get('error', 'unknown error')}"
+            )
+        values.append(result.get("value"))
+    return values
+
+
+# Plain namespaces over the module functions: `ccos_sdk.memory.get(...)` is
+# one attribute probe away from the function, with no bound-method creation.
+# The prompts and docs use this flat style rather than `ccos_sdk.ccos.memory`;
+# `ccos` is kept for backward compatibility.
+memory = SimpleNamespace(
+    get=get,
+    store=store,
+    compare_and_swap=compare_and_swap,
+    invalidate=invalidate,
+    invalidate_all=invalidate_all,
+)
+io = SimpleNamespace(log=log)
+ccos = SimpleNamespace(memory=memory, io=io, call=call, batch=batch)
+
+
+__all__ = ["ccos", "memory", "io", "call", "batch"]
@@ -4,6 +4,7 @@ pub mod config;
 pub mod dependency_manager;
 pub mod filesystem;
 pub mod manager;
+pub mod msgpack;
 pub mod network_proxy;
 pub mod refiner;
 pub mod resources;
@@ -0,0 +1,267 @@
+//! Minimal MessagePack codec for the sandbox `CCOS_CALLM::` / `CCOS_RESULTM::` frames.
+//!
+//! Covers exactly what is needed to carry `serde_json::Value`s between the host
+//! and `ccos_sdk.py` (which packs with `msgpack.packb(..., use_bin_type=True)`):
+//! nil, bool, integers, floats, str, array and map. Bin and extension types
+//! are rejected, so a call with `bytes` inputs fails under both encodings (the
+//! JSON path raises TypeError in the SDK). Non-string map keys become their
+//! JSON text, as `json.dumps` does, and non-finite floats become null, as with
+//! orjson.
+
+use serde_json::{Map, Number, Value};
+
+/// Same nesting limit serde_json applies when parsing.
+const MAX_DEPTH: usize = 128;
+
+/// Decode a single MessagePack value occupying all of `buf`.
+pub fn decode(buf: &[u8]) -> Result<Value, String> {
+    let mut reader = Reader { buf, pos: 0 };
+    let value = reader.value(0)?;
+    if reader.pos != buf.len() {
+        return Err(format!(
+            "{} trailing bytes after MessagePack value",
+            buf.len() - reader.pos
+        ));
+    }
+    Ok(value)
+}
+
+/// Encode a JSON value as MessagePack.
+pub fn encode(value: &Value) -> Vec<u8> {
+    let mut out = Vec::new();
+    write_value(&mut out, value);
+    out
+}
+
+struct Reader<'a> {
+    buf: &'a [u8],
+    pos: usize,
+}
+
+impl<'a> Reader<'a> {
+    fn take(&mut self, n: usize) -> Result<&'a [u8], String> {
+        let end = self
+            .pos
+            .checked_add(n)
+            .filter(|&end| end <= self.buf.len())
+            .ok_or_else(|| "truncated MessagePack value".to_string())?;
+        let bytes = &self.buf[self.pos..end];
+        self.pos = end;
+        Ok(bytes)
+    }
+
+    fn array_of<const N: usize>(&mut self) -> Result<[u8; N], String> {
+        let mut bytes = [0u8; N];
+        bytes.copy_from_slice(self.take(N)?);
+        Ok(bytes)
+    }
+
+    /// Read a big-endian length field of `width` bytes (1, 2 or 4).
+    fn len(&mut self, width: u8) -> Result<usize, String> {
+        Ok(match width {
+            1 => self.take(1)?[0] as usize,
+            2 => u16::from_be_bytes(self.array_of()?) as usize,
+            _ => u32::from_be_bytes(self.array_of()?) as usize,
+        })
+    }
+
+    fn string(&mut self, len: usize) -> Result<Value, String> {
+        std::str::from_utf8(self.take(len)?)
+            .map(|s| Value::String(s.to_string()))
+            .map_err(|e| format!("invalid UTF-8 in MessagePack str: {}", e))
+    }
+
+    fn array(&mut self, len: usize, depth: usize) -> Result<Value, String> {
+        // Every element takes at least one byte, so never trust `len` beyond that.
+        let mut items = Vec::with_capacity(len.min(self.buf.len() - self.pos));
+        for _ in 0..len {
+            items.push(self.value(depth + 1)?);
+        }
+        Ok(Value::Array(items))
+    }
+
+    fn map(&mut self, len: usize, depth: usize) -> Result<Value, String> {
+        let mut map = Map::new();
+        for _ in 0..len {
+            let key = match self.value(depth + 1)? {
+                Value::String(s) => s,
+                other => other.to_string(),
+            };
+            let value = self.value(depth + 1)?;
+            map.insert(key, value);
+        }
+        Ok(Value::Object(map))
+    }
+
+    fn value(&mut self, depth: usize) -> Result<Value, String> {
+        if depth > MAX_DEPTH {
+            return Err("MessagePack value nested too deeply".to_string());
+        }
+        let marker = self.take(1)?[0];
+        match marker {
+            0x00..=0x7f => Ok(Value::from(marker)),
+            0x80..=0x8f => self.map((marker & 0x0f) as usize, depth),
+            0x90..=0x9f => self.array((marker & 0x0f) as usize, depth),
+            0xa0..=0xbf => self.string((marker & 0x1f) as usize),
+            0xc0 => Ok(Value::Null),
+            0xc2 => Ok(Value::Bool(false)),
+            0xc3 => Ok(Value::Bool(true)),
+            0xc4..=0xc6 => Err(
+                "MessagePack bin is not supported: bytes cannot be sent as call inputs".to_string(),
+            ),
+            0xca => Ok(float(f32::from_be_bytes(self.array_of()?) as f64)),
+            0xcb => Ok(float(f64::from_be_bytes(self.array_of()?))),
+            0xcc => Ok(Value::from(self.take(1)?[0])),
+            0xcd => Ok(Value::from(u16::from_be_bytes(self.array_of()?))),
+            0xce => Ok(Value::from(u32::from_be_bytes(self.array_of()?))),
+            0xcf => Ok(Value::from(u64::from_be_bytes(self.array_of()?))),
+            0xd0 => Ok(Value::from(i8::from_be_bytes(self.array_of()?))),
+            0xd1 => Ok(Value::from(i16::from_be_bytes(self.array_of()?))),
+            0xd2 => Ok(Value::from(i32::from_be_bytes(self.array_of()?))),
+            0xd3 => Ok(Value::from(i64::from_be_bytes(self.array_of()?))),
+            0xd9..=0xdb => {
+                let len = self.len(1 << (marker - 0xd9))?;
+                self.string(len)
+            }
+            0xdc | 0xdd => {
+                let len = self.len(if marker == 0xdc { 2 } else { 4 })?;
+                self.array(len, depth)
+            }
+            0xde | 0xdf => {
+                let len = self.len(if marker == 0xde { 2 } else { 4 })?;
+                self.map(len, depth)
+            }
+            0xe0..=0xff => Ok(Value::from(marker as i8)),
+            _ => Err(format!("unsupported MessagePack marker 0x{:02x}", marker)),
+        }
+    }
+}
+
+fn float(f: f64) -> Value {
+    Number::from_f64(f)
+        .map(Value::Number)
+        .unwrap_or(Value::Null)
+}
+
+/// Write a str/array/map header: the fix form when `len <= fix_max`, else the
+/// smallest of the 8/16/32-bit forms (`m8` is absent for arrays and maps).
+fn write_header(out: &mut Vec<u8>, len: usize, fix: u8, fix_max: usize, m8: Option<u8>, m16: u8) {
+    if len <= fix_max {
+        out.push(fix | len as u8);
+    } else if let (Some(m8), true) = (m8, len <= u8::MAX as usize) {
+        out.push(m8);
+        out.push(len as u8);
+    } else if len <= u16::MAX as usize {
+        out.push(m16);
+        out.extend_from_slice(&(len as u16).to_be_bytes());
+    } else {
+        out.push(m16 + 1);
+        out.extend_from_slice(&(len as u32).to_be_bytes());
+    }
+}
+
+fn write_value(out: &mut Vec<u8>, value: &Value) {
+    match value {
+        Value::Null => out.push(0xc0),
+        Value::Bool(b) => out.push(if *b { 0xc3 } else { 0xc2 }),
+        Value::Number(n) => {
+            if let Some(u) = n.as_u64() {
+                if u <= 0x7f {
+                    out.push(u as u8);
+                } else if u <= u8::MAX as u64 {
+                    out.extend_from_slice(&[0xcc, u as u8]);
+                } else if u <= u16::MAX as u64 {
+                    out.push(0xcd);
+                    out.extend_from_slice(&(u as u16).to_be_bytes());
+                } else if u <= u32::MAX as u64 {
+                    out.push(0xce);
+                    out.extend_from_slice(&(u as u32).to_be_bytes());
+                } else {
+                    out.push(0xcf);
+                    out.extend_from_slice(&u.to_be_bytes());
+                }
+            } else if let Some(i) = n.as_i64() {
+                // Only negative values reach here.
+                if i >= -32 {
+                    out.push(i as i8 as u8);
+                } else if i >= i8::MIN as i64 {
+                    out.extend_from_slice(&[0xd0, i as i8 as u8]);
+                } else if i >= i16::MIN as i64 {
+                    out.push(0xd1);
+                    out.extend_from_slice(&(i as i16).to_be_bytes());
+                } else if i >= i32::MIN as i64 {
+                    out.push(0xd2);
+                    out.extend_from_slice(&(i as i32).to_be_bytes());
+                } else {
+                    out.push(0xd3);
+                    out.extend_from_slice(&i.to_be_bytes());
+                }
+            } else {
+                out.push(0xcb);
+                out.extend_from_slice(&n.as_f64().unwrap_or(0.0).to_be_bytes());
+            }
+        }
+        Value::String(s) => {
+            write_header(out, s.len(), 0xa0, 31, Some(0xd9), 0xda);
+            out.extend_from_slice(s.as_bytes());
+        }
+        Value::Array(items) => {
+            write_header(out, items.len(), 0x90, 15, None, 0xdc);
+            for item in items {
+                write_value(out, item);
+            }
+        }
+        Value::Object(map) => {
+            write_header(out, map.len(), 0x80, 15, None, 0xde);
+            for (key, item) in map {
+                write_header(out, key.len(), 0xa0, 31, Some(0xd9), 0xda);
+                out.extend_from_slice(key.as_bytes());
+                write_value(out, item);
+            }
+        }
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+    use serde_json::json;
+
+    #[test]
+    fn test_round_trip() {
+        let value = json!({
+            "cap": "ccos.memory.store",
+            "inputs": {
+                "key": "fibonacci_state",
+                "value": [0, 1, 127, 128, 255, 256, 65535, 65536, 4294967296u64, u64::MAX],
+                "neg": [-1, -32, -33, -128, -129, -32768, -32769, -2147483649i64, i64::MIN],
+                "float": 1.5,
+                "flags": [true, false, null],
+                "text": "héllo\nworld ✓",
+                "long": "x".repeat(300),
+                "many": (0..20).collect::<Vec<_>>(),
+            }
+        });
+        assert_eq!(decode(&encode(&value)).unwrap(), value);
+    }
+
+    #[test]
+    fn test_decode_python_packb_output() {
+        // msgpack.packb({"a": [1, -1, 1.5, None], 2: "b"}, use_bin_type=True)
+        let packed = b"\x82\xa1a\x94\x01\xff\xcb\x3f\xf8\x00\x00\x00\x00\x00\x00\xc0\x02\xa1b";
+        assert_eq!(
+            decode(packed).unwrap(),
+            json!({"a": [1, -1, 1.5, null], "2": "b"})
+        );
+    }
+
+    #[test]
+    fn test_decode_rejects_malformed_input() {
+        assert!(decode(b"\x92\x01").is_err()); // truncated array
+        assert!(decode(b"\x01\x02").is_err()); // trailing bytes
+        assert!(decode(b"\xc7\x01\x00\x00").is_err()); // ext type
+        assert!(decode(b"\xc4\x01\x01").is_err()); // bin (Python bytes)
+        assert!(decode(b"\xdd\xff\xff\xff\xff").is_err()); // oversized length
+        assert!(decode(&[0x91; 200]).is_err()); // nesting limit
+    }
+}
@@ -4,6 +4,7 @@
 //! - ccos.secrets.set: Store secrets with approval
 //! - ccos.memory.store: Persist onboarding state
 //! - ccos.memory.get: Retrieve onboarding state
+//! - ccos.memory.compare_and_swap: Atomically update onboarding state
 //! - ccos.approval.request_human_action: Request human intervention
 //! - ccos.approval.complete: Complete human action with response
 
@@ -92,6 +93,29 @@ struct MemoryGetOutput {
     expired: bool,
 }
 
+/// Input for ccos.memory.compare_and_swap
+#[derive(Debug, Deserialize)]
+struct MemoryCompareAndSwapInput {
+    key: String,
+    /// Expected current value; a missing or expired entry compares as null.
+    #[serde(default)]
+    old: serde_json::Value,
+    new: serde_json::Value,
+    skill_id: Option<String>,
+    #[serde(skip_serializing_if = "Option::is_none")]
+    ttl: Option<u64>,
+    #[serde(default)]
+    session_id: Option<String>,
+}
+
+/// Output for ccos.memory.compare_and_swap
+#[derive(Debug, Serialize)]
+struct MemoryCompareAndSwapOutput {
+    swapped: bool,
+    /// The value now stored under the key (`new` on success, else the current one).
+    value: serde_json::Value,
+}
+
 /// Input for ccos.approval.request_human_action
 #[derive(Debug, Deserialize)]
 struct RequestHumanActionInput {
@@ -378,6 +402,47 @@ pub async fn register_onboarding_capabilities<S: ApprovalStorage + 'static>(
         )
         .await?;
 
+    // ccos.memory.compare_and_swap
+    let working_memory_cas = working_memory.clone();
+    let memory_cas_handler = Arc::new(move |input: &Value| {
+        let payload: MemoryCompareAndSwapInput =
+            parse_payload("ccos.memory.compare_and_swap", input)?;
+        let wm = working_memory_cas.clone();
+        let rt_handle = tokio::runtime::Handle::current();
+
+        let result = std::thread::spawn(move || {
+            rt_handle.block_on(async { handle_memory_compare_and_swap(payload, wm).await })
+        })
+        .join()
+        .map_err(|_| {
+            RuntimeError::Generic("ccos.memory.compare_and_swap: thread join error".to_string())
+        })?;
+
+        result
+    });
+
+    let memory_cas_schema = TypeExpr::Map {
+        entries: vec![
+            string_field("key", false),
+            any_field("old", true),
+            any_field("new", false),
+            string_field("skill_id", true),
+            int_field("ttl", true),
+        ],
+        wildcard: None,
+    };
+
+    marketplace
+        .register_local_capability_with_schema(
+            "ccos.memory.compare_and_swap".to_string(),
+            "Onboarding / Memory Compare And Swap".to_string(),
+            "Store a value in working memory only if the current value matches".to_string(),
+            memory_cas_handler,
+            Some(memory_cas_schema),
+            None,
+        )
+        .await?;
+
     // ccos.approval.request_human_action
     let approval_queue_request = approval_queue.clone();
     let request_human_action_handler = Arc::new(move |input: &Value| {
@@ -764,50 +829,87 @@ async fn handle_secrets_set<S: ApprovalStorage>(
     produce_value("ccos.secrets.set", output)
 }
 
-/// Handle ccos.memory.store
-async fn handle_memory_store(
-    payload: MemoryStoreInput,
-    working_memory: Arc<StdMutex<WorkingMemory>>,
-) -> RuntimeResult<Value> {
-    let entry_id = if let Some(ref skill_id) = payload.skill_id {
-        format!("skill:{}:{}", skill_id, payload.key)
+/// Working memory entry id for a `ccos.memory.*` key.
+fn memory_entry_id(key: &str, skill_id: Option<&str>) -> String {
+    if let Some(skill_id) = skill_id {
+        format!("skill:{}:{}", skill_id, key)
     } else {
-        format!("global:{}", payload.key)
-    };
+        format!("global:{}", key)
+    }
+}
 
+fn now_secs() -> u64 {
+    std::time::SystemTime::now()
+        .duration_since(std::time::UNIX_EPOCH)
+        .unwrap_or_default()
+        .as_secs()
+}
+
+/// Build the working memory entry written by ccos.memory.store.
+fn build_memory_entry(
+    entry_id: &str,
+    key: &str,
+    value: &serde_json::Value,
+    skill_id: Option<&str>,
+    ttl: Option<u64>,
+    session_id: Option<&str>,
+) -> RuntimeResult<WorkingMemoryEntry> {
     let mut tags: HashSet<String> = HashSet::new();
     tags.insert("onboarding".to_string());
-    if let Some(ref skill_id) = payload.skill_id {
+    if let Some(skill_id) = skill_id {
         tags.insert(format!("skill:{}", skill_id));
     }
     // Tag with session ID when provided so cross-run WM queries can filter by session.
-    if let Some(ref sid) = payload.session_id {
+    if let Some(sid) = session_id {
         tags.insert(format!("session:{}", sid));
     }
 
-    let content = serde_json::to_string(&payload.value)
+    let content = serde_json::to_string(value)
         .map_err(|e| RuntimeError::Generic(format!("Failed to serialize value: {}", e)))?;
 
-    let now = std::time::SystemTime::now()
-        .duration_since(std::time::UNIX_EPOCH)
-        .unwrap_or_default()
-        .as_secs();
+    let now = now_secs();
 
     let mut meta = WorkingMemoryMeta::default();
-    if let Some(ttl) = payload.ttl {
+    if let Some(ttl) = ttl {
         meta.extra.insert("ttl".to_string(), ttl.to_string());
         meta.extra
             .insert("expires_at".to_string(), (now + ttl).to_string());
     }
 
-    let entry = WorkingMemoryEntry::new_with_estimate(
-        entry_id.clone(),
-        payload.key.clone(),
+    Ok(WorkingMemoryEntry::new_with_estimate(
+        entry_id.to_string(),
+        key.to_string(),
         content,
         tags,
         now,
         meta,
-    );
+    ))
+}
+
+/// Whether a ccos.memory entry is past its TTL.
+fn memory_entry_expired(entry: &WorkingMemoryEntry, now: u64) -> bool {
+    entry
+        .meta
+        .extra
+        .get("expires_at")
+        .and_then(|s| s.parse::<u64>().ok())
+        .map_or(false, |expires_at| now > expires_at)
+}
+
+/// Handle ccos.memory.store
+async fn handle_memory_store(
+    payload: MemoryStoreInput,
+    working_memory: Arc<StdMutex<WorkingMemory>>,
+) -> RuntimeResult<Value> {
+    let entry_id = memory_entry_id(&payload.key, payload.skill_id.as_deref());
+    let entry = build_memory_entry(
+        &entry_id,
+        &payload.key,
+        &payload.value,
+        payload.skill_id.as_deref(),
+        payload.ttl,
+        payload.session_id.as_deref(),
+    )?;
 
     let mut wm = working_memory
         .lock()
@@ -828,11 +930,7 @@ async fn handle_memory_get(
     payload: MemoryGetInput,
     working_memory: Arc<StdMutex<WorkingMemory>>,
 ) -> RuntimeResult<Value> {
-    let entry_id = if let Some(ref skill_id) = payload.skill_id {
-        format!("skill:{}:{}", skill_id, payload.key)
-    } else {
-        format!("global:{}", payload.key)
-    };
+    let entry_id = memory_entry_id(&payload.key, payload.skill_id.as_deref());
 
     let wm = working_memory
         .lock()
@@ -840,23 +938,8 @@ async fn handle_memory_get(
 
     match wm.get(&entry_id) {
         Ok(Some(entry)) => {
-            let now = std::time::SystemTime::now()
-                .duration_since(std::time::UNIX_EPOCH)
-                .unwrap_or_default()
-                .as_secs();
-
             // Check TTL
-            let expired = if let Some(expires_at_str) = entry.meta.extra.get("expires_at") {
-                if let Ok(expires_at) = expires_at_str.parse::<u64>() {
-                    now > expires_at
-                } else {
-                    false
-                }
-            } else {
-                false
-            };
-
-            if expired {
+            if memory_entry_expired(&entry, now_secs()) {
                 let output = MemoryGetOutput {
                     value: None,
                     found: true,
@@ -891,6 +974,60 @@ async fn handle_memory_get(
     }
 }
 
+/// Handle ccos.memory.compare_and_swap
+///
+/// The read, the comparison and the write happen under a single working
+/// memory lock, so no other writer can interleave between them.
+async fn handle_memory_compare_and_swap(
+    payload: MemoryCompareAndSwapInput,
+    working_memory: Arc<StdMutex<WorkingMemory>>,
+) -> RuntimeResult<Value> {
+    let entry_id = memory_entry_id(&payload.key, payload.skill_id.as_deref());
+
+    let mut wm = working_memory
+        .lock()
+        .map_err(|_| RuntimeError::Generic("Failed to lock working memory".to_string()))?;
+
+    let current = match wm.get(&entry_id) {
+        Ok(Some(entry)) if !memory_entry_expired(&entry, now_secs()) => {
+            serde_json::from_str(&entry.content)
+                .map_err(|e| RuntimeError::Generic(format!("Failed to deserialize value: {}", e)))?
+        }
+        Ok(_) => serde_json::Value::Null,
+        Err(e) => {
+            return Err(RuntimeError::Generic(format!(
+                "Failed to retrieve from working memory: {}",
+                e
+            )))
+        }
+    };
+
+    if current != payload.old {
+        let output = MemoryCompareAndSwapOutput {
+            swapped: false,
+            value: current,
+        };
+        return produce_value("ccos.memory.compare_and_swap", output);
+    }
+
+    let entry = build_memory_entry(
+        &entry_id,
+        &payload.key,
+        &payload.new,
+        payload.skill_id.as_deref(),
+        payload.ttl,
+        payload.session_id.as_deref(),
+    )?;
+    wm.append(entry)
+        .map_err(|e| RuntimeError::Generic(format!("Failed to store in working memory: {}", e)))?;
+
+    let output = MemoryCompareAndSwapOutput {
+        swapped: true,
+        value: payload.new,
+    };
+    produce_value("ccos.memory.compare_and_swap", output)
+}
+
 /// Handle ccos.approval.request_human_action
 async fn handle_request_human_action<S: ApprovalStorage>(
     payload: RequestHumanActionInput,
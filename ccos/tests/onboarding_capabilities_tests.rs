@@ -4,6 +4,7 @@
 //! - ccos.secrets.set
 //! - ccos.memory.store
 //! - ccos.memory.get
+//! - ccos.memory.compare_and_swap
 //! - ccos.approval.request_human_action
 //! - ccos.approval.complete
 
@@ -265,6 +266,62 @@ async fn test_memory_ttl_expiration() {
     assert!(get_json["value"].is_null()); // Value is None because expired
 }
 
+#[tokio::test]
+async fn test_memory_compare_and_swap() {
+    let (marketplace, _secret_store, _working_memory, _approval_queue) =
+        create_test_components().await;
+
+    let cas = |old: serde_json::Value, new: serde_json::Value| {
+        json_to_value(serde_json::json!({
+            "key": "counter",
+            "old": old,
+            "new": new,
+            "skill_id": "moltbook"
+        }))
+    };
+
+    // Missing key compares as null
+    let result = execute_capability(
+        &marketplace,
+        "ccos.memory.compare_and_swap",
+        cas(serde_json::Value::Null, serde_json::json!(1)),
+    )
+    .await
+    .expect("Failed to compare and swap");
+    let json = value_to_json(&result);
+    assert!(json["swapped"].as_bool().unwrap());
+    assert_eq!(json["value"].as_i64().unwrap(), 1);
+
+    // Stale expectation is rejected and reports the current value
+    let result = execute_capability(
+        &marketplace,
+        "ccos.memory.compare_and_swap",
+        cas(serde_json::json!(0), serde_json::json!(2)),
+    )
+    .await
+    .expect("Failed to compare and swap");
+    let json = value_to_json(&result);
+    assert!(!json["swapped"].as_bool().unwrap());
+    assert_eq!(json["value"].as_i64().unwrap(), 1);
+
+    // Matching expectation swaps, visible through ccos.memory.get
+    execute_capability(
+        &marketplace,
+        "ccos.memory.compare_and_swap",
+        cas(serde_json::json!(1), serde_json::json!(2)),
+    )
+    .await
+    .expect("Failed to compare and swap");
+    let get_args = json_to_value(serde_json::json!({
+        "key": "counter",
+        "skill_id": "moltbook"
+    }));
+    let get_result = execute_capability(&marketplace, "ccos.memory.get", get_args)
+        .await
+        .expect("Failed to get value");
+    assert_eq!(value_to_json(&get_result)["value"].as_i64().unwrap(), 2);
+}
+
 #[tokio::test]
 async fn test_request_human_action() {
     let (marketplace, _secret_store, _working_memory, approval_queue) =
@@ -1,14 +1,7 @@
-
-import json
-import logging
-import asyncio
-import os
-import httpx
-
 # Mocking the interaction with the gateway to test package approval
 # We will use ccos.execute.python and check if it returns a retry hint when a package is not approved
 
-async def test_package_approval():
+def test_package_approval():
     # Since we can't easily run the full gateway and agent in this environment,
     # we will try to execute the newly built ccos binary with a command that triggers package approval.
     
@@ -30,4 +23,4 @@ async def test_package_approval():
     # Since we only have the binary, we'll try to run them.
 
 if __name__ == "__main__":
-    asyncio.run(test_package_approval())
+    test_package_approval()
@@ -4,9 +4,14 @@ migrate_chats_to_repo.py
 
 Create an export of the `chats/` directory into a standalone folder (e.g. `ccos-chats`).
 Behavior (safe defaults):
- - Copies all `chats/*.md` as-is.
- - Compresses each `chats/*.json` into `{name}.json.zst` (preferred) or `{name}.json.gz`.
- - Writes a small `{name}.meta.json` for each chat with original size, compressed size and sha256.
+ - Packs all `chats/*.md` and `chats/*.json` into a single `chats.tar.zst` (preferred) or
+   `chats.tar.gz`, so zstd can exploit the redundancy between chats. Its last member,
+   `manifest.json`, lists each file's original size and the sha256 of its content (same
+   as its git LFS oid). Extract with `tar --zstd -xf chats.tar.zst`.
+ - With --per-file, uses the older layout instead: copies `chats/*.md` as-is and
+   compresses each `chats/*.json` into `{name}.json.zst` or `{name}.json.gz` (files that
+   would not shrink, e.g. base64 attachments, are copied as-is), with a `manifest.json`
+   that also records compressed sizes (or a `{name}.meta.json` per chat with --per-file-meta).
  - Produces a summary of total bytes and savings.
 
 The script does NOT push any git remotes. It will not remove files from the original repo unless you pass --remove-originals (dangerous).
@@ -24,67 +29,299 @@ Usage examples:
 from __future__ import annotations
 
 import argparse
+import functools
 import hashlib
+import io
 import json
 import os
+import random
 import shutil
 import stat
 import subprocess
 import sys
+import tarfile
 import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
 
+try:
+    import zstandard as zstd
+except ImportError:
+    zstd = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# gzip fallback: ISA-L's igzip (python-isal) is a drop-in several times faster
+# than zlib; its top level 3 is roughly on par with zlib -9 for ratio.
+try:
+    from isal import igzip as gzip_mod
+
+    GZIP_LEVEL = 3
+except ImportError:
+    import gzip as gzip_mod
+
+    GZIP_LEVEL = 9
+
 DEFAULT_OUTPUT = Path(__file__).resolve().parents[1] / "../ccos-chats"
 
+# 15 keeps nearly all of the -19 ratio on chat JSON at a fraction of the time;
+# 19+ is the archival tier where throughput collapses for a few % of ratio.
+DEFAULT_ZSTD_LEVEL = 15
 
-def run(cmd, check=True, capture=False):
-    if capture:
-        return subprocess.run(cmd, shell=True, check=check, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-    return subprocess.run(cmd, shell=True, check=check)
+# Read/write chunk for the compression streams. zstd's own recommended sizes
+# (~128 KiB) measured no faster than this on chat JSON; 4 MiB was slower.
+COPY_BUF = 1 << 20
+# JSON files above this size are compressed one at a time with a multi-threaded
+# zstd compressor; smaller ones go to the process pool, one file per worker.
+BIG_FILE_SIZE = 8 << 20
+# Input handed to each zstd worker thread at a time. Without a cap the
+# multi-threaded compressor sizes jobs from the window (tens of MiB at high
+# levels) and keeps several in flight, so RSS scales with the file.
+ZSTD_JOB_SIZE = 4 << 20
 
+# Default output: one tar of every chat file, compressed as a single stream.
+ARCHIVE_NAME = "chats.tar"
 
-def detect_zstd_binary() -> bool:
-    try:
-        subprocess.run(["zstd", "--version"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-        return True
-    except FileNotFoundError:
-        return False
+# Optional shared dictionary (--zstd-dict), trained on a sample of the small
+# chats. Decompressing then needs the dictionary: `zstd -d -D chats.zdict`.
+ZSTD_DICT_NAME = "chats.zdict"
+ZSTD_DICT_SIZE = 128 << 10
+ZSTD_DICT_SAMPLES = 100
+
+# Output files are preallocated up to this size before compressing into them.
+PREALLOC_MAX = 2 << 20
+
+# Threads for copying the markdown files; the copies are I/O-bound.
+MD_COPY_WORKERS = 4
+
+# Files whose first PROBE_SIZE bytes do not shrink by at least MIN_RATIO at a
+# fast level (e.g. base64 attachments, already-compressed data) are stored as-is.
+PROBE_SIZE = 64 << 10
+MIN_RATIO = 1.05
+
+# Chunk for the pure-Python hashing fallback, where fewer, larger reads win.
+HASH_BUF = 4 << 20
+
+
+def run(cmd: list[str], check=True, capture=False):
+    # argv lists, no shell: nothing to quote and no extra /bin/sh per call
+    if capture:
+        return subprocess.run(cmd, check=check, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    return subprocess.run(cmd, check=check)
 
 
 def sha256_file(path: Path) -> str:
-    h = hashlib.sha256()
     with path.open("rb") as f:
-        for chunk in iter(lambda: f.read(1 << 20), b""):
-            h.update(chunk)
-    return h.hexdigest()
+        if hasattr(hashlib, "file_digest"):  # Python 3.11+
+            return hashlib.file_digest(f, "sha256").hexdigest()
+        # Older Pythons: one reusable buffer filled with readinto(), no
+        # per-chunk bytes allocation.
+        h = hashlib.sha256()
+        buf = bytearray(HASH_BUF)
+        view = memoryview(buf)
+        while n := f.readinto(buf):
+            h.update(view[:n])
+        return h.hexdigest()
+
+
+class _HashingReader:
+    """File wrapper that SHA-256s and counts everything read through it, so the
+    plaintext is hashed by the same read that feeds the compressor."""
+
+    def __init__(self, f):
+        self.f = f
+        self.h = hashlib.sha256()
+        self.size = 0
+
+    def read(self, n: int = -1) -> bytes:
+        b = self.f.read(n)
+        self.h.update(b)
+        self.size += len(b)
+        return b
+
+
+def _preallocate(f, size: int) -> None:
+    """Reserve up to PREALLOC_MAX bytes for `f` so the filesystem can lay the
+    output out in one extent instead of growing it write by write."""
+    if hasattr(os, "posix_fallocate") and size > 0:
+        try:
+            os.posix_fallocate(f.fileno(), 0, min(size, PREALLOC_MAX))
+        except OSError:
+            pass  # not supported by this filesystem
+
 
+def _trim(f, size: int) -> None:
+    """Drop whatever preallocated space past `size` was not written."""
+    f.flush()
+    os.ftruncate(f.fileno(), size)
 
-def compress_with_zstd_binary(src: Path, dst: Path) -> None:
-    # Use -19 (max) and multi-thread (-T0) for best ratio/speed
-    cmd = ["zstd", "-19", "-T0", str(src), "-o", str(dst)]
-    subprocess.run(cmd, check=True)
 
+# One compressor per (level, threads), created lazily in each worker process
+# and reused for every file that process handles.
+_zstd_compressors: dict = {}
+_zstd_dict = None
 
-def compress_with_gzip(src: Path, dst: Path) -> None:
-    import gzip
 
-    with src.open("rb") as f_in, gzip.open(dst, "wb", compresslevel=9) as f_out:
-        shutil.copyfileobj(f_in, f_out)
+def _set_zstd_dict(dict_bytes) -> None:
+    """Install the shared dictionary in this process (also the pool initializer)."""
+    global _zstd_dict
+    _zstd_dict = zstd.ZstdCompressionDict(dict_bytes) if dict_bytes else None
+    _zstd_compressors.clear()
 
 
-def write_meta(out_dir: Path, basename: str, original_size: int, compressed_size: int, sha256: str, compression: str) -> None:
-    meta = {
+def train_zstd_dict(files: list[Path]):
+    """Train a dictionary on a (reproducible) sample of `files`; None if zstd cannot."""
+    picks = random.Random(0).sample(files, min(ZSTD_DICT_SAMPLES, len(files)))
+    samples = [p.read_bytes() for p in picks]
+    try:
+        return zstd.train_dictionary(ZSTD_DICT_SIZE, samples).as_bytes()
+    except zstd.ZstdError as e:
+        print(f"Could not train a zstd dictionary ({e}); compressing without one")
+        return None
+
+
+def _zstd_compressor(level: int, threads: int = 1):
+    # zstandard's threads=1 still starts one worker thread; anything below 2
+    # gets a truly single-threaded compressor (threads=0, the default), which
+    # owns no threads and is safe to inherit across the pool's fork.
+    threads = threads if threads > 1 else 0
+    key = (level, threads)
+    cctx = _zstd_compressors.get(key)
+    if cctx is None:
+        if threads:
+            params = zstd.ZstdCompressionParameters.from_level(
+                level, threads=threads, job_size=ZSTD_JOB_SIZE, write_checksum=True
+            )
+            cctx = zstd.ZstdCompressor(dict_data=_zstd_dict, compression_params=params)
+        else:
+            cctx = zstd.ZstdCompressor(level=level, dict_data=_zstd_dict, write_checksum=True)
+        _zstd_compressors[key] = cctx
+    return cctx
+
+
+def compress_with_zstd(
+    src: Path, dst: Path, size: int, level: int = DEFAULT_ZSTD_LEVEL, threads: int = 1
+) -> tuple[str, int, int]:
+    """Compress `src` into `dst` in a single pass.
+
+    Returns (SHA-256 of the original content, bytes read, bytes written).
+    The compressed side is covered by the frame's own checksum.
+
+    Each call writes one complete frame, so nothing buffered by the compressor
+    carries over from one file to the next.
+    """
+    with src.open("rb") as f_in, dst.open("wb") as f_out:
+        _preallocate(f_out, size)
+        hr = _HashingReader(f_in)
+        read, written = _zstd_compressor(level, threads).copy_stream(
+            hr, f_out, size=size, read_size=COPY_BUF, write_size=COPY_BUF
+        )
+        _trim(f_out, written)
+    return hr.h.hexdigest(), read, written
+
+
+def compress_with_gzip(src: Path, dst: Path, size: int) -> tuple[str, int, int]:
+    """Compress `src` into `dst` in a single pass.
+
+    Returns (SHA-256 of the original content, bytes read, bytes written).
+    The compressed side is covered by the gzip trailer's CRC-32. The header
+    timestamp is fixed (mtime=0) so re-runs give identical files.
+    """
+    with src.open("rb") as f_in, dst.open("wb") as raw_out:
+        _preallocate(raw_out, size)
+        hr = _HashingReader(f_in)
+        with gzip_mod.GzipFile(filename=dst.name, mode="wb", compresslevel=GZIP_LEVEL, fileobj=raw_out, mtime=0) as f_out:
+            while chunk := hr.read(COPY_BUF):
+                f_out.write(chunk)
+        written = raw_out.tell()
+        _trim(raw_out, written)
+    return hr.h.hexdigest(), hr.size, written
+
+
+def is_incompressible(src: Path) -> bool:
+    with src.open("rb") as f:
+        sample = f.read(PROBE_SIZE)
+    if not sample:
+        return False
+    if zstd is not None:
+        probe = _zstd_compressor(1).compress(sample)
+    else:
+        import zlib
+
+        probe = zlib.compress(sample, 1)
+    return len(sample) / len(probe) < MIN_RATIO
+
+
+def make_meta(basename: str, original_size: int, compressed_size: int, sha256_plaintext: str, compression: str) -> dict:
+    return {
         "file": basename,
         "original_size": original_size,
         "compressed_size": compressed_size,
-        "sha256": sha256,
+        "sha256_plaintext": sha256_plaintext,
         "compression": compression,
         "created_at": time.time(),
     }
-    meta_path = out_dir / f"{basename}.meta.json"
-    with meta_path.open("w", encoding="utf-8") as f:
-        json.dump(meta, f, indent=2)
+
+
+def _json_bytes(obj) -> bytes:
+    # Serialise in one go; orjson when available.
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+    return json.dumps(obj, indent=2).encode("utf-8")
+
+
+def write_meta(out_dir: Path, meta: dict) -> None:
+    (out_dir / f"{meta['file']}.meta.json").write_bytes(_json_bytes(meta))
+
+
+def build_manifest(entries: list[dict], **extra) -> dict:
+    manifest = {"entries": sorted(entries, key=lambda m: m["file"]), "created_at": time.time()}
+    manifest.update((k, v) for k, v in extra.items() if v)
+    return manifest
+
+
+def write_manifest(out_dir: Path, entries: list[dict], dictionary: str | None = None) -> None:
+    (out_dir / "manifest.json").write_bytes(_json_bytes(build_manifest(entries, dictionary=dictionary)))
+
+
+def write_archive(
+    files: list[Path], out_dir: Path, use_zstd: bool, zstd_level: int = DEFAULT_ZSTD_LEVEL, zstd_threads: int = 1
+) -> tuple[Path, list[dict], int]:
+    """Stream `files` into one compressed tar in a single pass.
+
+    Each member is hashed on the read that feeds the archive, and the
+    resulting manifest.json is appended as the last member. Returns (archive
+    path, manifest entries, archive size).
+    """
+    compression = "zstd" if use_zstd else "gzip"
+    archive = out_dir / (f"{ARCHIVE_NAME}.zst" if use_zstd else f"{ARCHIVE_NAME}.gz")
+    entries = []
+    with archive.open("wb") as f_out:
+        if use_zstd:
+            stream = _zstd_compressor(zstd_level, zstd_threads).stream_writer(f_out, write_size=COPY_BUF, closefd=False)
+        else:
+            stream = gzip_mod.GzipFile(filename=ARCHIVE_NAME, mode="wb", compresslevel=GZIP_LEVEL, fileobj=f_out, mtime=0)
+        with stream, tarfile.open(fileobj=stream, mode="w|", bufsize=COPY_BUF, copybufsize=COPY_BUF) as tar:
+            for f in files:
+                info = tar.gettarinfo(f, arcname=f.name)
+                # Do not leak the exporting user's account into the archive.
+                info.uid = info.gid = 0
+                info.uname = info.gname = ""
+                with f.open("rb") as f_in:
+                    hr = _HashingReader(f_in)
+                    tar.addfile(info, hr)
+                entries.append({"file": f.name, "original_size": hr.size, "sha256_plaintext": hr.h.hexdigest()})
+
+            data = _json_bytes(build_manifest(entries, compression=compression))
+            info = tarfile.TarInfo("manifest.json")
+            info.size = len(data)
+            info.mtime = int(time.time())
+            tar.addfile(info, io.BytesIO(data))
+        size = f_out.tell()
+    return archive, entries, size
 
 
 def ensure_output_dir(path: Path, force: bool):
@@ -99,19 +336,31 @@ def ensure_output_dir(path: Path, force: bool):
 
 def copy_md_files(src_dir: Path, out_dir: Path, dry_run: bool):
     md_files = sorted(src_dir.glob("*.md"))
-    copied = 0
-    for f in md_files:
-        dest = out_dir / f.name
-        if dry_run:
-            print(f"[DRY] Would copy MD: {f} -> {dest}")
-            copied += 1
-            continue
-        shutil.copy2(f, dest)
-        copied += 1
-    return copied
-
-
-def process_json_file(f: Path, out_dir: Path, use_zstd: bool, dry_run: bool) -> tuple[int, int]:
+    if dry_run:
+        for f in md_files:
+            print(f"[DRY] Would copy MD: {f} -> {out_dir / f.name}")
+        return len(md_files)
+    # Contents only: git does not track timestamps, so copy2's copystat
+    # (extra stat/chmod/utime syscalls per file) buys nothing here.
+    # copyfile already uses sendfile on Linux; a few threads overlap the
+    # per-file open/create latency on slow or networked disks.
+    with ThreadPoolExecutor(max_workers=MD_COPY_WORKERS) as ex:
+        for _ in ex.map(lambda f: shutil.copyfile(f, out_dir / f.name), md_files):
+            pass
+    return len(md_files)
+
+
+def process_json_file(
+    f: Path,
+    original_size: int,
+    out_dir: Path,
+    use_zstd: bool,
+    dry_run: bool,
+    zstd_level: int = DEFAULT_ZSTD_LEVEL,
+    zstd_threads: int = 1,
+    per_file_meta: bool = False,
+) -> dict:
+    """Compress one chat JSON into `out_dir` and return its metadata entry."""
     basename = f.name
     if use_zstd:
         out_name = f"{basename}.zst"
@@ -121,22 +370,116 @@ def process_json_file(f: Path, out_dir: Path, use_zstd: bool, dry_run: bool) ->
         compression = "gzip"
     out_path = out_dir / out_name
 
-    original_size = f.stat().st_size
-
     if dry_run:
         print(f"[DRY] Would compress {f} -> {out_path} using {compression}")
-        return original_size, 0
-
-    # Perform compression
+        return make_meta(basename, original_size, 0, "", compression)
+
+    if is_incompressible(f):
+        # Compressing would barely shrink (or even grow) it: store it as-is.
+        out_path = out_dir / basename
+        shutil.copyfile(f, out_path)
+        meta = make_meta(basename, original_size, original_size, sha256_file(f), "none")
+        if per_file_meta:
+            write_meta(out_dir, meta)
+        return meta
+
+    # One pass per file: read, compress, and hash/count the output as it is
+    # written. The sizes come from the stream rather than extra stat() calls.
     if use_zstd:
-        compress_with_zstd_binary(f, out_path)
+        sha, original_size, compressed_size = compress_with_zstd(f, out_path, original_size, zstd_level, zstd_threads)
+    else:
+        sha, original_size, compressed_size = compress_with_gzip(f, out_path, original_size)
+
+    meta = make_meta(basename, original_size, compressed_size, sha, compression)
+    if per_file_meta:
+        write_meta(out_dir, meta)
+    return meta
+
+
+def _try_process_json_file(f: Path, original_size: int, **kwargs):
+    """process_json_file for executor.map: returns the error message instead of
+    raising, so one bad file does not abort the rest of the batch."""
+    try:
+        return process_json_file(f, original_size, **kwargs)
+    except Exception as e:
+        return f"Error processing {f.name}: {e}"
+
+
+def export_per_file(
+    src_chats: Path, out_dir: Path, json_files: list[Path], sizes: dict, use_zstd: bool, workers: int, args
+) -> list[dict]:
+    """The --per-file layout: MDs copied, each JSON compressed on its own."""
+    # Copy MD files
+    copied_md = copy_md_files(src_chats, out_dir, args.dry_run)
+    print(f"MD files copied: {copied_md}")
+
+    # Compress the JSON files in parallel, largest first
+    # (longest-processing-time-first), so a big file submitted last does not
+    # leave one worker running alone at the end.
+    json_files = sorted(json_files, key=lambda f: (-sizes[f], f.name))
+    if args.dry_run:
+        print(f"[DRY-RUN] Would process {len(json_files)} JSON files")
     else:
-        compress_with_gzip(f, out_path)
+        print(f"Processing {len(json_files)} JSON files with {workers} workers...")
 
-    compressed_size = out_path.stat().st_size
-    sha = sha256_file(out_path)
-    write_meta(out_dir, basename, original_size, compressed_size, sha, compression)
-    return original_size, compressed_size
+    # Chat sizes are bimodal. Big files get every core through zstd's own
+    # worker threads, one file at a time; per-file threading is wasted on
+    # small files, which instead run one per pool process.
+    big_files = []
+    small_files = json_files
+    if use_zstd:
+        big_files = [f for f in json_files if sizes[f] > BIG_FILE_SIZE]
+        small_files = [f for f in json_files if sizes[f] <= BIG_FILE_SIZE]
+
+    dict_bytes = None
+    if use_zstd and args.zstd_dict and small_files:
+        if args.dry_run:
+            print(f"[DRY] Would train a zstd dictionary -> {out_dir / ZSTD_DICT_NAME}")
+        else:
+            dict_bytes = train_zstd_dict(small_files)
+            if dict_bytes:
+                (out_dir / ZSTD_DICT_NAME).write_bytes(dict_bytes)
+                _set_zstd_dict(dict_bytes)
+                print(f"Trained zstd dictionary: {len(dict_bytes)} bytes -> {ZSTD_DICT_NAME}")
+
+    task = functools.partial(
+        _try_process_json_file,
+        out_dir=out_dir,
+        use_zstd=use_zstd,
+        dry_run=args.dry_run,
+        zstd_level=args.zstd_level,
+        per_file_meta=args.per_file_meta,
+    )
+    results = [task(f, sizes[f], zstd_threads=workers) for f in big_files]
+    # Free the multi-threaded compressor before forking the pool: a child
+    # inherits it without its worker threads, and freeing it there (e.g. when
+    # the initializer installs the dictionary) waits on them forever.
+    _zstd_compressors.clear()
+
+    # Processes, not threads: in-process compression holds the GIL for the
+    # Python-side buffer handling. Each worker compresses single-threaded so
+    # the two levels of parallelism do not oversubscribe the cores. map() with
+    # a chunksize ships files to the workers in batches (fewer pickles and
+    # wakeups than one future per file). The size-sorted list is dealt out
+    # round-robin across the chunks so each batch holds a similar spread of
+    # sizes, rather than the first one taking all the largest files.
+    chunksize = max(1, len(small_files) // (workers * 4))
+    n_chunks = -(-len(small_files) // chunksize)
+    small_files = [f for i in range(n_chunks) for f in small_files[i::n_chunks]]
+    pool_init = (_set_zstd_dict, (dict_bytes,)) if dict_bytes else (None, ())
+    with ProcessPoolExecutor(max_workers=workers, initializer=pool_init[0], initargs=pool_init[1]) as ex:
+        results.extend(ex.map(task, small_files, [sizes[f] for f in small_files], chunksize=chunksize))
+
+    entries = []
+    for result in results:
+        if isinstance(result, str):
+            print(result)
+        else:
+            entries.append(result)
+
+    if not args.dry_run:
+        write_manifest(out_dir, entries, ZSTD_DICT_NAME if dict_bytes else None)
+    return entries
 
 
 def main(argv=None):
@@ -144,12 +487,27 @@ def main(argv=None):
     parser.add_argument("--output-dir", type=Path, default=Path("../ccos-chats"), help="Directory to create the new repo in (default ../ccos-chats)")
     parser.add_argument("--fetch-lfs", action="store_true", help="Run `git lfs pull --include=\"chats/*\"` before exporting (requires network)")
     parser.add_argument("--init-git", action="store_true", help="Run git init and make an initial commit in the output directory")
-    parser.add_argument("--use-zstd", action="store_true", help="Force use zstd binary; if not present the script will error unless --use-gzip is set")
+    parser.add_argument("--use-zstd", action="store_true", help="Force use zstd; if the zstandard module is not installed the script will error unless --use-gzip is set")
+    parser.add_argument(
+        "--zstd-level",
+        type=int,
+        default=DEFAULT_ZSTD_LEVEL,
+        help=f"zstd compression level (default {DEFAULT_ZSTD_LEVEL}). Roughly: 1-8 fast, 10-15 good ratio at "
+        "reasonable speed, 19-22 archival (much slower for a few %% smaller output)",
+    )
+    parser.add_argument(
+        "--zstd-dict",
+        action="store_true",
+        help=f"With --per-file: train a shared zstd dictionary on a sample of the chats and compress with it (much "
+        f"better on small files). It is saved as {ZSTD_DICT_NAME} and needed for decompression: zstd -d -D {ZSTD_DICT_NAME}",
+    )
     parser.add_argument("--use-gzip", action="store_true", help="Force use gzip compression instead of zstd")
     parser.add_argument("--dry-run", action="store_true", help="Show what would be done without writing files")
     parser.add_argument("--force", action="store_true", help="Allow writing into a non-empty output directory")
     parser.add_argument("--remove-originals", action="store_true", help="(DANGEROUS) Remove the original chats/*.json from the current repo after copying (NOT recommended)")
-    parser.add_argument("--workers", type=int, default=4, help="Parallel workers for compression")
+    parser.add_argument("--per-file", action="store_true", help=f"Compress each chat JSON separately and copy the MDs (the old layout) instead of writing a single {ARCHIVE_NAME}.zst")
+    parser.add_argument("--per-file-meta", action="store_true", help="With --per-file: also write a {name}.meta.json next to each chat besides manifest.json")
+    parser.add_argument("--workers", type=int, default=None, help="Parallel worker processes for compression (default: CPU count)")
 
     args = parser.parse_args(argv)
 
@@ -170,59 +528,68 @@ def main(argv=None):
     if args.fetch_lfs:
         print("Fetching LFS objects for chats/ (this may use network bandwidth)...")
         try:
-            run("git lfs pull --include=\"chats/*\"")
+            run(["git", "lfs", "pull", "--include=chats/*"])
         except Exception as e:
             raise SystemExit(f"git lfs pull failed: {e}")
 
     # Decide compression method
-    zstd_available = detect_zstd_binary()
+    zstd_available = zstd is not None
     if args.use_gzip:
         use_zstd = False
     elif args.use_zstd:
         if not zstd_available:
-            raise SystemExit("Requested zstd but 'zstd' binary was not found on PATH")
+            raise SystemExit("Requested zstd but the 'zstandard' module is not installed (pip install zstandard)")
         use_zstd = True
     else:
         # Default: use zstd if available, else gzip
         use_zstd = zstd_available
 
     if use_zstd:
-        print("Using zstd binary for compression")
+        print(f"Using zstd (zstandard module) level {args.zstd_level} for compression")
     else:
-        print("Using gzip compression (built-in) - install zstd for better ratios if desired")
-
-    # Copy MD files
-    copied_md = copy_md_files(src_chats, out_dir, args.dry_run)
-    print(f"MD files copied: {copied_md}")
-
-    # Find JSON files and compress in parallel
-    json_files = sorted(src_chats.glob("*.json"))
-    total_original = 0
-    total_compressed = 0
-
-    if args.dry_run:
-        print(f"[DRY-RUN] Would process {len(json_files)} JSON files")
+        print(f"Using gzip compression ({gzip_mod.__name__}) - pip install zstandard for better ratios if desired")
+
+    # List the JSON files. scandir hands back the entries with the directory
+    # listing; each is stat'ed once here and the size passed down, never
+    # re-stat'ed.
+    with os.scandir(src_chats) as it:
+        sizes = {
+            Path(e.path): e.stat().st_size
+            for e in it
+            if e.name.endswith(".json") and e.is_file()
+        }
+    json_files = list(sizes)
+    workers = args.workers or os.cpu_count() or 1
+
+    if args.per_file:
+        entries = export_per_file(src_chats, out_dir, json_files, sizes, use_zstd, workers, args)
+        count_line = f"JSON files processed: {len(json_files)}"
+        compressed_label = "Total compressed bytes"
+        total_original = sum(m["original_size"] for m in entries)
+        total_compressed = sum(m["compressed_size"] for m in entries)
     else:
-        print(f"Processing {len(json_files)} JSON files with {args.workers} workers...")
-
-    futures = []
-    results = []
-    with ThreadPoolExecutor(max_workers=args.workers) as ex:
-        for f in json_files:
-            futures.append(ex.submit(process_json_file, f, out_dir, use_zstd, args.dry_run))
-        for fut in as_completed(futures):
-            try:
-                orig, comp = fut.result()
-                total_original += orig
-                total_compressed += comp
-            except Exception as e:
-                print(f"Error processing a file: {e}")
+        if args.zstd_dict or args.per_file_meta:
+            print("Note: --zstd-dict and --per-file-meta only apply with --per-file; ignoring")
+        files = sorted([*json_files, *src_chats.glob("*.md")], key=lambda f: f.name)
+        archive = out_dir / f"{ARCHIVE_NAME}.{'zst' if use_zstd else 'gz'}"
+        # The archive holds the MDs too, and its size includes the tar headers
+        # and the manifest, so the totals cover every packed file.
+        count_line = f"Files packed: {len(files)} ({len(json_files)} JSON, {len(files) - len(json_files)} MD)"
+        compressed_label = "Archive bytes (incl. tar headers and manifest)"
+        if args.dry_run:
+            print(f"[DRY] Would pack {len(files)} files ({len(json_files)} JSON) into {archive}")
+            total_original = sum(sizes.get(f) or f.stat().st_size for f in files)
+            total_compressed = 0
+        else:
+            print(f"Packing {len(files)} files ({len(json_files)} JSON) into {archive.name}...")
+            archive, entries, total_compressed = write_archive(files, out_dir, use_zstd, args.zstd_level, workers)
+            total_original = sum(m["original_size"] for m in entries)
 
     # Summary
     print("\nMigration summary:")
-    print(f"  JSON files processed: {len(json_files)}")
+    print(f"  {count_line}")
     print(f"  Total original bytes: {total_original}")
-    print(f"  Total compressed bytes: {total_compressed}")
+    print(f"  {compressed_label}: {total_compressed}")
     if total_original:
         saved = total_original - total_compressed
         pct = saved / total_original * 100
@@ -232,9 +599,9 @@ def main(argv=None):
     if args.init_git and not args.dry_run:
         print("Initializing git repo in output directory...")
         try:
-            run(f"git -C {out_dir} init")
-            run(f"git -C {out_dir} add .")
-            run(f"git -C {out_dir} commit -m \"Import compressed chats from main repo\"")
+            run(["git", "-C", str(out_dir), "init"])
+            run(["git", "-C", str(out_dir), "add", "."])
+            run(["git", "-C", str(out_dir), "commit", "-m", "Import compressed chats from main repo"])
             print("Git repo initialized and initial commit created. Review before pushing to remote.")
         except Exception as e:
             print(f"Git init / commit failed: {e}")